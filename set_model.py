@@ -5,14 +5,38 @@ import os
 import platform
 import re
 import time
-import requests
-import urllib3
+import socket
+import functools
+import shutil
+import stat
+import atexit
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+from typing import Callable, Dict, Optional, Sequence, Tuple, List, NamedTuple
 
-# 禁用SSL警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# 配置文件的 JSON 读写：优先使用更快的 orjson（可选依赖），否则回退到标准库
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+@functools.lru_cache(maxsize=None)
+def _requests():
+    """延迟导入 requests：切换模型、查看帮助等不联网的命令无需承担其导入开销"""
+    import requests
+    import urllib3
+
+    # 禁用SSL警告
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    return requests
 
 
 def mask_sensitive_info(value: str, show_chars: int = 8) -> str:
@@ -22,9 +46,120 @@ def mask_sensitive_info(value: str, show_chars: int = 8) -> str:
     return value[:show_chars] + "*" * (len(value) - show_chars)
 
 
+# 合法的环境变量名，符合该规则的名字无需 re.escape
+_VALID_VAR_NAME = re.compile(r'\A[A-Za-z_][A-Za-z0-9_]*\Z')
+
+
+@functools.lru_cache(maxsize=64)
+def _export_pattern(var_names: Tuple[str, ...]) -> re.Pattern:
+    """获取同时匹配多个 `export VAR=` 行的正则（按变量名组合缓存编译结果）"""
+    invalid = [name for name in var_names if not _VALID_VAR_NAME.match(name)]
+    if invalid:
+        raise ValueError(f"无效的环境变量名: {', '.join(invalid)}")
+    alternation = "|".join(var_names)
+    return re.compile(rf'^([ \t]*)export[ \t]+({alternation})[ \t]*=.*$', re.MULTILINE)
+
+
+# 深度探测的请求体对所有模型都相同，预先序列化一次
+_DEEP_PROBE_BODY = json.dumps({
+    "model": "claude-3-5-sonnet-20241022",
+    "max_tokens": 1,
+    "messages": [{"role": "user", "content": "1"}],
+    "stream": True
+}).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def _proxy_schemes() -> frozenset:
+    """环境变量中配置了代理的协议（如 http、https）"""
+    import urllib.request
+
+    proxies = urllib.request.getproxies()
+    if "all" in proxies:
+        return frozenset(("http", "https"))
+    return frozenset(proxies)
+
+
+@functools.lru_cache(maxsize=128)
+def _resolve(host: str, port: int) -> List[tuple]:
+    """解析主机地址（缓存结果，并发探测和重复刷新时不再重复查询 DNS）"""
+    return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+
+
+def _open_connection(host: str, port: int, timeout: float) -> socket.socket:
+    """使用缓存的 DNS 结果建立 TCP 连接，依次尝试每个地址"""
+    error = None
+    for family, sock_type, proto, _, address in _resolve(host, port):
+        sock = socket.socket(family, sock_type, proto)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error or OSError(f"无法解析主机: {host}")
+
+
+def _copy_config(config: dict) -> dict:
+    """复制配置（模型名 -> 配置项 的两层结构），比 copy.deepcopy 开销小"""
+    return {
+        name: dict(entry) if isinstance(entry, dict) else entry
+        for name, entry in config.items()
+    }
+
+
+def _atomic_write_bytes(path: str, data: bytes):
+    """原子写入文件：先写同目录下的临时文件并刷到磁盘，再用 os.replace 替换
+
+    临时文件一开始就使用目标文件的权限位（新文件为 0600），令牌不会以默认权限落盘；
+    失败时删除临时文件并重新抛出异常。
+    """
+    # 目标常是 dotfiles 仓库的软链接，替换其指向的真实文件以保留链接
+    path = os.path.realpath(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o600
+    # 临时文件名带上进程号，多个进程同时写入时互不覆盖；
+    # O_EXCL 确保由本进程新建，不会沿用残留或被预先放置的同名文件（及软链接）
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), mode)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 创建时的权限受 umask 影响，这里与目标文件对齐
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ModelEntry(NamedTuple):
+    """单个模型的连接配置（热路径上用属性访问代替字典查找）"""
+    base_url: str
+    token: str
+
+
+# 进度条上次绘制的时间，用于限制重绘频率
+_last_progress_draw = 0.0
+
+
 def print_progress_bar(current: int, total: int, prefix: str = "", length: int = 30):
-    """打印进度条"""
-    percent = current / total
+    """打印进度条（最多每 50ms 重绘一次，完成时总会绘制）"""
+    global _last_progress_draw
+    now = time.monotonic()
+    if current != total and now - _last_progress_draw < 0.05:
+        return
+    _last_progress_draw = now
+
+    percent = current / total if total else 1.0
     filled = int(length * percent)
     bar = "█" * filled + "░" * (length - filled)
     sys.stdout.write(f"\r{prefix} [{bar}] {current}/{total} ({percent*100:.0f}%)")
@@ -38,12 +173,20 @@ class EnvManager:
 
     # 默认超时时间（秒）
     DEFAULT_TIMEOUT = 5
+    # 热身前 TCP 预检的超时时间（秒）
+    PREFLIGHT_TIMEOUT = 2
+    # 测试结果的有效期（秒），期间重复测试同一模型直接使用上次结果
+    PROBE_CACHE_TTL = 5.0
 
     # 全局配置目录
     DEFAULT_CONFIG_DIR = os.path.expanduser("~/.config/claude-switch")
     DEFAULT_CONFIG_FILE = "config.json"
 
-    def __init__(self, config_path: str = None, timeout: int = None):
+    # 已解析配置的缓存：{配置路径: ((mtime_ns, 文件大小), 配置)}，文件变化时失效
+    _config_cache: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+    def __init__(self, config_path: str = None, timeout: int = None, fast_probe: bool = False,
+                 deep_probe: bool = False, use_cache: bool = True):
         # 如果没有指定配置文件，使用全局配置
         if config_path is None:
             config_path = os.path.join(self.DEFAULT_CONFIG_DIR, self.DEFAULT_CONFIG_FILE)
@@ -51,12 +194,25 @@ class EnvManager:
         self.config_path = config_path
         self.config_dir = os.path.dirname(config_path)
         self.system = platform.system()
+        self._home = Path.home()
         self.timeout = timeout or self.DEFAULT_TIMEOUT
+        # 快速探测：只测 TCP/TLS 握手，不发送 HTTP 请求
+        self.fast_probe = fast_probe
+        # 深度探测：发送真实的 messages 请求（会触发模型推理），验证上游模型可用
+        self.deep_probe = deep_probe
+        # 本进程内已热身（连接池中已有连接）的主机
+        self._warmed_hosts = set()
+        # 测试结果缓存：{模型名: (测试时间, (是否可用, 响应时间))}
+        self._probe_cache: Dict[str, Tuple[float, Tuple[bool, Optional[float]]]] = {}
+        self.probe_cache_ttl = self.PROBE_CACHE_TTL if use_cache else 0
 
         # 确保配置目录存在
         self._ensure_config_dir()
 
-        self.config = self._load_config()
+    @functools.cached_property
+    def config(self) -> dict:
+        """模型配置（首次访问时才加载）"""
+        return self._load_config()
 
     def _ensure_config_dir(self):
         """确保配置目录存在"""
@@ -71,98 +227,183 @@ class EnvManager:
             if local_config.exists():
                 print(f"💡 检测到本地配置文件，正在迁移到全局配置目录...")
                 try:
-                    import shutil
                     shutil.copy2(local_config, config_file)
                     print(f"✅ 配置已迁移到: {config_file}")
                     print(f"💡 现在可以在任何目录使用 claude-switch 命令了！")
-                except Exception as e:
+                except OSError as e:
                     print(f"⚠️  迁移失败: {e}")
             else:
                 # 创建空配置文件
                 print(f"💡 首次使用，正在创建配置文件: {config_file}")
-                with config_file.open("w", encoding="utf-8") as f:
-                    json.dump({}, f, indent=2)
+                config_file.write_text("{}", encoding="utf-8")
                 print(f"✅ 配置文件已创建")
                 print(f"💡 使用 'claude-switch add' 添加 API 配置")
                 return {}
 
+        # 文件未修改时直接使用已解析结果的副本（各实例修改配置互不影响）
+        file_key = self._file_key(self.config_path)
+        cached = self._config_cache.get(self.config_path)
+        if cached and cached[0] == file_key:
+            return _copy_config(cached[1])
+
         try:
-            with config_file.open("r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
+            data = config_file.read_bytes()
+            config = _json_loads(data)
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError 是其子类
             print(f"❌ 错误：配置文件格式不正确 - {e}")
             sys.exit(1)
 
-    def _get_shell_config(self) -> Optional[str]:
-        """获取 shell 配置文件路径"""
-        home = os.path.expanduser("~")
-
-        # 检测常见的 shell 配置文件
-        shell_configs = [
-            f"{home}/.zshrc",  # zsh
-            f"{home}/.bashrc",  # bash
-            f"{home}/.bash_profile",  # bash (macOS)
-            f"{home}/.profile"  # POSIX shell
-        ]
-
-        for config in shell_configs:
-            if os.path.exists(config):
-                return config
+        self._config_cache[self.config_path] = (file_key, _copy_config(config))
+        return config
+
+    @staticmethod
+    def _file_key(path: str) -> Tuple[int, int]:
+        """文件的 (mtime_ns, 大小)，用作配置缓存的失效依据"""
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    @functools.cached_property
+    def shell_config(self) -> str:
+        """shell 配置文件路径（只检测一次）"""
+        home = self._home
+
+        # 优先根据登录 shell（$SHELL）确定配置文件，无需探测文件系统
+        shell = os.path.basename(os.environ.get("SHELL", ""))
+        if shell == "zsh":
+            return str(home / ".zshrc")
+        if shell == "bash":
+            return str(home / (".bash_profile" if self.system == "Darwin" else ".bashrc"))
+
+        # 检测常见的 shell 配置文件：zsh、bash、bash (macOS)、POSIX shell
+        # 一次读取主目录代替逐个 stat
+        try:
+            with os.scandir(home) as entries:
+                present = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            present = set()  # 主目录不可读时使用默认值
+        for name in (".zshrc", ".bashrc", ".bash_profile", ".profile"):
+            if name in present:
+                return str(home / name)
 
         # 默认使用 .bashrc
-        return f"{home}/.bashrc"
-
-    def _is_var_in_file(self, filepath: str, var_name: str) -> bool:
-        """检查环境变量是否已在文件中"""
-        if not os.path.exists(filepath):
-            return False
+        return str(home / ".bashrc")
 
-        pattern = re.compile(rf'^\s*export\s+{re.escape(var_name)}\s*=', re.MULTILINE)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            return bool(pattern.search(content))
+    @staticmethod
+    def _upsert_vars(content: str, env_vars: Dict[str, str]) -> str:
+        """在内存中一次扫描更新所有环境变量的 export 行，不存在的追加到末尾"""
+        if not env_vars:
+            return content
 
-    def _update_var_in_file(self, filepath: str, var_name: str, var_value: str):
-        """更新文件中的环境变量"""
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        found = set()
 
-        pattern = re.compile(rf'^\s*export\s+{re.escape(var_name)}\s*=')
-        updated = False
+        def replace(match: re.Match) -> str:
+            indent, name = match.groups()
+            found.add(name)
+            # 保留原有缩进（export 行可能位于 if 块等结构中）
+            return f'{indent}export {name}="{env_vars[name]}"'
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            for line in lines:
-                if pattern.match(line):
-                    f.write(f'export {var_name}="{var_value}"\n')
-                    updated = True
-                else:
-                    f.write(line)
-
-            # 如果没有找到，追加到文件末尾
-            if not updated:
-                f.write(f'\nexport {var_name}="{var_value}"\n')
+        new_content = _export_pattern(tuple(env_vars)).sub(replace, content)
+        for name, value in env_vars.items():
+            if name not in found:
+                new_content += f'\nexport {name}="{value}"\n'
+        return new_content
 
     def set_windows_env(self, env_vars: Dict[str, str]):
-        """设置 Windows 环境变量"""
+        """设置 Windows 环境变量（直接写入 HKCU\\Environment）"""
         print("🪟 Windows 系统检测到")
-        for key, value in env_vars.items():
-            try:
-                # 使用 setx 设置用户环境变量
-                result = subprocess.run(
-                    ["setx", key, value],
-                    shell=True,
-                    capture_output=True,
-                    text=True
-                )
-                if result.returncode == 0:
-                    print(f"✅ 已设置：{key}={value}")
-                else:
-                    print(f"⚠️  警告：设置 {key} 失败 - {result.stderr}")
-            except Exception as e:
-                print(f"❌ 错误：无法设置 {key} - {e}")
+        try:
+            import winreg
+            key = winreg.OpenKey(
+                winreg.HKEY_CURRENT_USER, "Environment", 0,
+                winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE
+            )
+        except OSError as e:
+            print(f"⚠️  无法打开注册表，改用 PowerShell - {e}")
+            self._powershell_env(env_vars)
+        else:
+            changed = False
+            # 收集输出，最后一次性打印
+            messages = []
+            with key:
+                for name, value in env_vars.items():
+                    try:
+                        # 注册表中已是目标值时跳过写入
+                        if self._registry_value(key, name) == value:
+                            messages.append(f"✓ {name} 已是最新")
+                            continue
+
+                        value_type = winreg.REG_EXPAND_SZ if "%" in value else winreg.REG_SZ
+                        winreg.SetValueEx(key, name, 0, value_type, value)
+                        changed = True
+                        messages.append(f"✅ 已设置：{name}={value}")
+                    except (OSError, TypeError) as e:  # TypeError: 配置中的值不是字符串
+                        messages.append(f"❌ 错误：无法设置 {name} - {e}")
+
+            print("\n".join(messages))
+
+            # 所有变量写完后只广播一次，没有改动时不广播
+            if changed:
+                self._broadcast_env_change()
+            elif all(os.environ.get(name) == value for name, value in env_vars.items()):
+                # 注册表和当前窗口都已是目标值，无需重新打开命令行窗口
+                return
 
         print("\n⚠️  注意：需要重新打开命令行窗口才能生效")
 
+    @staticmethod
+    def _registry_value(key, name: str) -> Optional[str]:
+        """读取注册表中的环境变量值，不存在时返回 None"""
+        import winreg
+        try:
+            return winreg.QueryValueEx(key, name)[0]
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _broadcast_env_change():
+        """广播 WM_SETTINGCHANGE，通知新开的窗口读取最新环境变量"""
+        import ctypes
+
+        HWND_BROADCAST = 0xFFFF
+        WM_SETTINGCHANGE = 0x001A
+        SMTO_ABORTIFHUNG = 0x0002
+        result = ctypes.c_size_t()
+        ctypes.windll.user32.SendMessageTimeoutW(
+            HWND_BROADCAST, WM_SETTINGCHANGE, 0, "Environment",
+            SMTO_ABORTIFHUNG, 5000, ctypes.byref(result)
+        )
+
+    def _powershell_env(self, env_vars: Dict[str, str]):
+        """通过一次 PowerShell 调用设置用户环境变量（注册表不可用时的后备方案）"""
+        # PowerShell 单引号字符串中的单引号需要写成两个
+        try:
+            entries = "; ".join(
+                "'{}'='{}'".format(key.replace("'", "''"), value.replace("'", "''"))
+                for key, value in env_vars.items()
+            )
+        except (AttributeError, TypeError) as e:  # 配置中的值不是字符串
+            print(f"❌ 错误：无法设置环境变量 - {e}")
+            return
+        script = (
+            f"$e = @{{{entries}}}; "
+            "foreach ($k in $e.Keys) { [Environment]::SetEnvironmentVariable($k, $e[$k], 'User') }"
+        )
+        try:
+            result = subprocess.run(
+                ["powershell", "-NoProfile", "-Command", script],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+        except OSError as e:  # 如找不到 powershell
+            print(f"❌ 错误：无法设置环境变量 - {e}")
+            return
+
+        if result.returncode == 0:
+            print("\n".join(f"✅ 已设置：{key}={value}" for key, value in env_vars.items()))
+        else:
+            print(f"⚠️  警告：设置环境变量失败 - {result.stderr}")
+
     def set_linux_env(self, env_vars: Dict[str, str], silent: bool = False):
         """设置 Linux/macOS 环境变量
 
@@ -170,24 +411,38 @@ class EnvManager:
             env_vars: 环境变量字典
             silent: 是否静默模式（不输出冗余信息）
         """
-        shell_config = self._get_shell_config()
+        shell_config = self.shell_config
 
         if not silent:
             print(f"📝 配置文件：{shell_config}")
 
-        for key, value in env_vars.items():
+        # 跳过无法写成 export 语句的变量名
+        invalid = [key for key in env_vars if not _VALID_VAR_NAME.match(key)]
+        if invalid:
+            print(f"❌ 错误：无效的环境变量名 {', '.join(invalid)}")
+            env_vars = {key: value for key, value in env_vars.items() if key not in invalid}
+
+        # 一次读取、在内存中完成所有替换、一次写回
+        path = Path(shell_config)
+        try:
+            content = path.read_text(encoding='utf-8') if path.exists() else ""
+        except (OSError, UnicodeError) as e:
+            print(f"❌ 错误：无法读取 {shell_config} - {e}")
+            return
+
+        new_content = self._upsert_vars(content, env_vars)
+
+        # 值未变化时跳过写入（重复切换到同一模型时无需改动文件）
+        # 原子写入，写入中途失败也不会留下半截的 shell 配置
+        if new_content != content:
             try:
-                if self._is_var_in_file(shell_config, key):
-                    self._update_var_in_file(shell_config, key, value)
-                    if not silent:
-                        print(f"✓ {key}")
-                else:
-                    with open(shell_config, "a", encoding="utf-8") as f:
-                        f.write(f'\nexport {key}="{value}"\n')
-                    if not silent:
-                        print(f"✓ {key}")
-            except Exception as e:
-                print(f"❌ 错误：无法设置 {key} - {e}")
+                _atomic_write_bytes(shell_config, new_content.encode('utf-8'))
+            except (OSError, UnicodeError) as e:
+                print(f"❌ 错误：无法写入 {shell_config} - {e}")
+                return
+
+        if not silent:
+            print("\n".join(f"✓ {key}" for key in env_vars))
 
     def set_env_variables(self, env_vars: Dict[str, str], silent: bool = False):
         """根据系统类型设置环境变量
@@ -207,6 +462,8 @@ class EnvManager:
     def test_api(self, model_name: str, timeout: int = None, use_warmup: bool = True) -> Tuple[bool, Optional[float]]:
         """测试API连接（优化版本，支持热身请求）
 
+        短时间内重复测试同一模型时直接返回上次的结果（见 PROBE_CACHE_TTL）。
+
         Args:
             model_name: 模型名称
             timeout: 超时时间（秒）
@@ -214,61 +471,152 @@ class EnvManager:
 
         返回: (是否可用, 响应时间)
         """
-        if model_name not in self.config:
-            return False, None
-
-        config = self.config[model_name]
-        base_url = config.get("ANTHROPIC_BASE_URL", "")
-        token = config.get("ANTHROPIC_AUTH_TOKEN", "")
-
-        if not base_url or not token:
+        cached = self._cached_probe(model_name)
+        if cached:
+            return cached
+
+        result = self._probe_api(model_name, timeout, use_warmup)
+        self._probe_cache[model_name] = (time.monotonic(), result)
+        return result
+
+    def _cached_probe(self, model_name: str) -> Optional[Tuple[bool, Optional[float]]]:
+        """返回仍在有效期内的测试结果，没有则返回 None"""
+        hit = self._probe_cache.get(model_name)
+        if hit and time.monotonic() - hit[0] < self.probe_cache_ttl:
+            return hit[1]
+        return None
+
+    def _probe_api(self, model_name: str, timeout: int = None, use_warmup: bool = True) -> Tuple[bool, Optional[float]]:
+        """实际发送探测请求，返回 (是否可用, 响应时间)"""
+        entry = self._entries.get(model_name)
+        if not entry or not entry.base_url or not entry.token:
             return False, None
+        base_url, token = entry
 
         # 使用实例的超时时间或传入的超时时间
         actual_timeout = timeout or self.timeout
 
-        # 热身请求（绕过首包惩罚，复用连接池）
-        if use_warmup:
+        if self.fast_probe:
             try:
-                self._make_test_request(base_url, token, actual_timeout)
-            except:
-                pass  # 热身请求失败不影响后续测试
+                return True, self._tcp_tls_probe(base_url, actual_timeout)
+            except (OSError, ValueError):  # ValueError: URL 无效
+                return False, None
+
+        # 热身请求（绕过首包惩罚，复用连接池）；主机已热身过则无需重复
+        # 热身请求失败不影响后续测试
+        if use_warmup and self._model_host(model_name) not in self._warmed_hosts:
+            self._warmup(model_name, actual_timeout)
 
         # 实际测速请求
         try:
-            start_time = time.time()
-            self._make_test_request(base_url, token, actual_timeout)
-            response_time = time.time() - start_time
-            return True, response_time
-
-        except requests.exceptions.Timeout:
-            return False, None
-        except requests.exceptions.ConnectionError:
-            return False, None
-        except Exception:
+            start_time = time.perf_counter()
+            status_code = self._make_test_request(base_url, token, actual_timeout)
+            response_time = time.perf_counter() - start_time
+        except (OSError, ValueError):
+            # 超时、连接失败（requests 的异常均继承自 OSError）、URL 无效等均视为不可用
             return False, None
 
-    def _make_test_request(self, base_url: str, token: str, timeout: int):
-        """发送测试请求的内部方法"""
+        # 401/403/405 等同样说明主机和 TLS 正常；5xx 说明服务端或上游故障
+        if status_code >= 500:
+            return False, None
+        return True, response_time
+
+    @functools.cached_property
+    def _ssl_context(self) -> "ssl.SSLContext":
+        """快速探测使用的 TLS 上下文（与 HTTP 探测一致，不校验证书）"""
+        import ssl
+
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _tcp_tls_probe(self, base_url: str, timeout: int) -> float:
+        """只建立 TCP 连接并完成 TLS 握手，返回耗时（秒）"""
+        parts = urlsplit(base_url)
+        host = parts.hostname
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        if not host:
+            raise ValueError(f"URL 中缺少主机名: {base_url}")
+
+        start_time = time.perf_counter()
+        with _open_connection(host, port, timeout) as sock:
+            if parts.scheme == "https":
+                with self._ssl_context.wrap_socket(sock, server_hostname=host):
+                    pass
+        return time.perf_counter() - start_time
+
+    @functools.cached_property
+    def _session(self) -> "requests.Session":
+        """共享连接池：热身请求建立的连接可被后续测速请求复用（首次使用时创建）"""
+        requests = _requests()
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # 中转服务常用自签名证书，统一在会话上关闭证书校验
+        session.verify = False
+        # 所有探测请求相同的请求头只设置一次，每次请求只需附带各自的 token
+        session.headers["anthropic-version"] = "2023-06-01"
+        return session
+
+    def _make_test_request(self, base_url: str, token: str, timeout: int) -> int:
+        """发送测试请求的内部方法，返回 HTTP 状态码
+
+        默认使用不带请求体的 HEAD 请求，只测量网络和 TLS 延迟，
+        不触发上游模型推理、不消耗额度。深度探测时改为发送 max_tokens=1 的流式请求。
+        """
         test_url = f"{base_url.rstrip('/')}/v1/messages"
-        response = requests.post(
+        if not self.deep_probe:
+            response = self._session.head(
+                test_url,
+                headers={"x-api-key": token},
+                timeout=timeout,
+                allow_redirects=False
+            )
+            return response.status_code
+
+        response = self._session.post(
             test_url,
-            headers={
-                "x-api-key": token,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
-                "model": "claude-3-5-sonnet-20241022",
-                "max_tokens": 1,
-                "messages": [{"role": "user", "content": "1"}],
-                "stream": True
-            },
+            headers={"x-api-key": token, "content-type": "application/json"},
+            data=_DEEP_PROBE_BODY,
             timeout=timeout,
-            verify=False,
             stream=True
         )
+        # 只关心首包，立即关闭以免读取流式响应
         response.close()
+        return response.status_code
+
+    @functools.cached_property
+    def _entries(self) -> Dict[str, ModelEntry]:
+        """模型名 -> ModelEntry，由配置一次性解析得到"""
+        return {
+            model_name: ModelEntry(
+                config.get("ANTHROPIC_BASE_URL", ""),
+                config.get("ANTHROPIC_AUTH_TOKEN", "")
+            )
+            for model_name, config in self.config.items()
+        }
+
+    def get_entry(self, model_name: str) -> Optional[ModelEntry]:
+        """获取模型的连接配置，模型不存在时返回 None"""
+        return self._entries.get(model_name)
+
+    @functools.cached_property
+    def _model_names(self) -> Tuple[str, ...]:
+        """按配置顺序排列的模型名快照"""
+        return tuple(self.config)
+
+    @functools.cached_property
+    def _reverse_index(self) -> Dict[ModelEntry, str]:
+        """(BASE_URL, TOKEN) -> 模型名 的反向索引"""
+        index = {}
+        for model_name, entry in self._entries.items():
+            # 多个模型配置相同时保留第一个
+            index.setdefault(entry, model_name)
+        return index
 
     def get_current_model(self) -> Optional[str]:
         """获取当前使用的模型"""
@@ -278,19 +626,16 @@ class EnvManager:
         if not current_url:
             return None
 
-        for model_name, config in self.config.items():
-            if (config.get("ANTHROPIC_BASE_URL") == current_url and
-                config.get("ANTHROPIC_AUTH_TOKEN") == current_token):
-                return model_name
-
-        return "未知"
+        return self._reverse_index.get((current_url, current_token), "未知")
 
-    def list_models(self, show_status: bool = False, show_config: bool = False):
+    def list_models(self, show_status: bool = False, show_config: bool = False,
+                    results: Optional[Dict[str, Tuple[bool, Optional[float]]]] = None):
         """列出所有可用模型
 
         Args:
             show_status: 是否显示状态和响应时间
             show_config: 是否显示配置信息（URL和Token）
+            results: 已有的测试结果，提供时不再重新测试
         """
         current = self.get_current_model()
 
@@ -298,42 +643,70 @@ class EnvManager:
             print(f"当前: {current}\n")
 
         if show_status:
-            # 使用并发测试
-            results = self.test_apis_concurrent(show_progress=True)
+            models = self._model_names
+            if results is not None:
+                self._print_status_table(models, results, current)
+            else:
+                # 表头先行，每个模型测完立即输出一行，不必等最慢的端点
+                index = {model: i for i, model in enumerate(models, 1)}
+                self._print_status_header()
 
-            print(f"\n{'序号':<4} {'模型名':<15} {'状态':<8} {'响应时间':<10} {'标记':<10}")
-            print("-" * 60)
+                def print_row(model: str, status: bool, resp_time: Optional[float]):
+                    sys.stdout.write("\r\033[K")  # 清除进度条所在行
+                    self._print_status_row(index[model], model, status, resp_time, current)
 
-            for i, model in enumerate(self.config.keys(), 1):
-                status, resp_time = results.get(model, (False, None))
-                status_icon = "✅" if status else "❌"
-                time_str = f"{resp_time:.2f}s" if resp_time else "N/A"
-                marker = "⭐ 当前" if model == current else ""
-                print(f"{i:<4} {model:<15} {status_icon:<8} {time_str:<10} {marker:<10}")
+                self.test_apis_concurrent(models, show_progress=True, on_result=print_row)
+                sys.stdout.write("\r\033[K")
+                sys.stdout.flush()
 
             # 如果需要显示配置信息
             if show_config:
                 print("\n" + "=" * 60)
                 print("配置信息 (Token 已脱敏)")
                 print("=" * 60)
-                for model in self.config.keys():
-                    config = self.config[model]
+                for model in models:
+                    entry = self._entries[model]
                     marker = " ⭐" if model == current else ""
                     print(f"\n{model}{marker}")
-                    print(f"  URL:   {config.get('ANTHROPIC_BASE_URL', 'N/A')}")
-                    token = config.get('ANTHROPIC_AUTH_TOKEN', '')
-                    print(f"  TOKEN: {mask_sensitive_info(token, 10)}")
+                    print(f"  URL:   {entry.base_url or 'N/A'}")
+                    print(f"  TOKEN: {mask_sensitive_info(entry.token, 10)}")
         else:
             print("📋 可用模型：")
-            for i, model in enumerate(self.config.keys(), 1):
+            for i, model in enumerate(self._model_names, 1):
                 marker = " ⭐" if model == current and current != "未知" else ""
                 print(f"  {i}. {model}{marker}")
 
+    def _print_status_table(self, models: Sequence[str], results: Dict[str, Tuple[bool, Optional[float]]],
+                            current: Optional[str], marker_text: str = "⭐ 当前"):
+        """打印模型状态表格"""
+        print()
+        self._print_status_header()
+        for i, model in enumerate(models, 1):
+            status, resp_time = results.get(model, (False, None))
+            self._print_status_row(i, model, status, resp_time, current, marker_text)
+
+    @staticmethod
+    def _print_status_header():
+        """打印状态表格的表头"""
+        print(f"{'序号':<4} {'模型名':<15} {'状态':<8} {'响应时间':<10} {'标记':<10}")
+        print("-" * 60)
+
+    @staticmethod
+    def _print_status_row(i: int, model: str, status: bool, resp_time: Optional[float],
+                          current: Optional[str], marker_text: str = "⭐ 当前"):
+        """打印状态表格中的一行"""
+        status_icon = "✅" if status else "❌"
+        time_str = f"{resp_time:.2f}s" if resp_time else "N/A"
+
+        # 标记当前使用的模型
+        marker = marker_text if model == current and current != "未知" else ""
+        print(f"{i:<4} {model:<15} {status_icon:<8} {time_str:<10} {marker:<10}")
+
     def switch_model(self, model_name: str, auto_reload: bool = True):
         """切换到指定模型"""
         if model_name not in self.config:
             print(f"❌ 模型 '{model_name}' 未配置")
-            print(f"可用模型：{', '.join(self.config.keys())}")
+            print(f"可用模型：{', '.join(self._model_names)}")
             sys.exit(1)
 
         print(f"🔄 切换到：{model_name}")
@@ -348,7 +721,7 @@ class EnvManager:
                 for key, value in self.config[model_name].items():
                     os.environ[key] = value
                 print(f"✅ 已切换到 {model_name}")
-            except Exception as e:
+            except (TypeError, ValueError) as e:  # 配置中的值不是字符串或含有空字符
                 print(f"⚠️ 警告：{e}")
                 print(f"✅ 配置已更新到 shell 文件")
 
@@ -363,27 +736,21 @@ class EnvManager:
             print(f"当前: {current}\n")
         else:
             print(f"当前: 未设置\n")
-        # 使用并发测试
-        models = list(self.config.keys())
-        results = self.test_apis_concurrent(models, show_progress=True)
-
-        print(f"\n{'序号':<4} {'模型名':<15} {'状态':<8} {'响应时间':<10} {'标记':<10}")
-        print("-" * 60)
-
-        for i, model in enumerate(models, 1):
-            status, resp_time = results.get(model, (False, None))
-            status_icon = "✅" if status else "❌"
-            time_str = f"{resp_time:.2f}s" if resp_time else "N/A"
-
-            # 标记当前使用的模型（更醒目）
-            marker = "⭐ 当前启用" if model == current and current != "未知" else ""
-            print(f"{i:<4} {model:<15} {status_icon:<8} {time_str:<10} {marker:<10}")
 
-        print("\n" + "-" * 70)
-        print("输入序号切换模型，输入 'r' 刷新状态，或输入 'q' 退出")
+        models = self._model_names
+        refresh = True
 
         while True:
             try:
+                if refresh:
+                    refresh = False  # 先复位，测试出错时不会反复重试
+                    # 使用并发测试（刷新时复用已建立的连接池）
+                    results = self.test_apis_concurrent(models, show_progress=True)
+                    self._print_status_table(models, results, current, marker_text="⭐ 当前启用")
+
+                    print("\n" + "-" * 70)
+                    print("输入序号切换模型，输入 'r' 刷新状态，或输入 'q' 退出")
+
                 choice = input("\n请选择: ").strip()
 
                 if choice.lower() == 'q':
@@ -391,8 +758,10 @@ class EnvManager:
                     break
 
                 if choice.lower() == 'r':
-                    # 刷新状态，递归调用
-                    return self.interactive_mode()
+                    # 用户主动刷新时忽略缓存，确保重新测试
+                    self._probe_cache.clear()
+                    refresh = True
+                    continue
 
                 if not choice.isdigit():
                     print("❌ 请输入有效的序号")
@@ -406,10 +775,11 @@ class EnvManager:
                 else:
                     print("❌ 序号超出范围")
 
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n\n👋 退出")
                 break
             except Exception as e:
+                # 单次测试或切换出错（如配置数据异常）只报告错误，不结束交互
                 print(f"❌ 错误: {e}")
 
     def add_model(self, name: str, base_url: str, token: str):
@@ -471,7 +841,7 @@ class EnvManager:
             print("❌ 此功能仅支持 Linux/macOS 系统")
             return False
 
-        shell_config = self._get_shell_config()
+        shell_config = self.shell_config
         if not shell_config:
             print("❌ 无法检测到 shell 配置文件")
             return False
@@ -488,25 +858,19 @@ class EnvManager:
         # 生成别名命令
         alias_line = f"alias claude-switch='source {wrapper_script}'"
 
-        # 检查别名是否已经存在
+        # 同一个文件句柄完成检查和追加：a+ 模式下文件不存在时自动创建
         try:
-            with open(shell_config, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if 'alias claude-switch=' in content:
+            with open(shell_config, 'a+', encoding='utf-8') as f:
+                f.seek(0)
+                if 'alias claude-switch=' in f.read():
                     print(f"✅ 别名已存在于 {shell_config}")
                     print(f"   当前配置: {alias_line}")
                     print(f"\n💡 请运行以下命令使别名生效：")
                     print(f"   source {shell_config}")
                     return True
-        except Exception as e:
-            print(f"❌ 读取配置文件失败: {e}")
-            return False
 
-        # 添加别名
-        try:
-            with open(shell_config, 'a', encoding='utf-8') as f:
-                f.write(f'\n# Claude Switch - 模型切换工具别名\n')
-                f.write(f'{alias_line}\n')
+                # 添加别名（a+ 模式下写入总是追加到文件末尾）
+                f.write(f'\n# Claude Switch - 模型切换工具别名\n{alias_line}\n')
 
             print(f"✅ 别名已添加到 {shell_config}")
             print(f"   配置内容: {alias_line}")
@@ -518,224 +882,439 @@ class EnvManager:
             print(f"   claude-switch current      # 查看当前模型")
             return True
 
-        except Exception as e:
+        except (OSError, UnicodeError) as e:
             print(f"❌ 添加别名失败: {e}")
             return False
 
     def _save_config(self):
         """保存配置到文件"""
+        # 与磁盘上的文件内容一致时（如 update 为相同的值）跳过序列化和写入
+        cached = self._config_cache.get(self.config_path)
+        if cached and cached[1] == self.config:
+            try:
+                if cached[0] == self._file_key(self.config_path):
+                    return
+            except OSError:
+                pass  # 文件已不存在，照常写入
+
+        # 配置已变更，清除由配置派生的缓存
+        self.__dict__.pop("_entries", None)
+        self.__dict__.pop("_reverse_index", None)
+        self.__dict__.pop("_model_names", None)
+        self._probe_cache.clear()
+
+        # 原子写入：写入中途失败或断电都不会破坏原配置
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
+            _atomic_write_bytes(self.config_path, _json_dumps(self.config))
+        except (OSError, TypeError) as e:  # TypeError: 配置中有无法序列化的值
             print(f"❌ 保存配置失败: {e}")
             sys.exit(1)
 
-    def test_apis_concurrent(self, models: List[str] = None, show_progress: bool = True) -> Dict[str, Tuple[bool, Optional[float]]]:
-        """并发测试多个API"""
+        # 用刚写入的内容更新缓存，下次加载无需重新解析
+        self._config_cache[self.config_path] = (
+            self._file_key(self.config_path), _copy_config(self.config)
+        )
+
+    @functools.cached_property
+    def _executor(self) -> "concurrent.futures.ThreadPoolExecutor":
+        """测速线程池：进程内共享，交互模式反复刷新时不再重复创建线程"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(32, len(self.config) or 1), thread_name_prefix="cs-probe"
+        )
+        atexit.register(executor.shutdown, wait=False, cancel_futures=True)
+        return executor
+
+    def _model_host(self, model_name: str) -> str:
+        """获取模型 BASE_URL 的主机部分（host:port）"""
+        entry = self._entries.get(model_name)
+        if not entry:
+            return ""
+        try:
+            return urlsplit(entry.base_url).netloc
+        except ValueError:  # 如 http://[::1 这类格式错误的 URL
+            return ""
+
+    def _warmup(self, model_name: str, timeout: int = None) -> bool:
+        """热身请求：预先建立连接，返回模型所在主机是否可达"""
+        entry = self._entries.get(model_name)
+        if not entry or not entry.base_url or not entry.token:
+            return False
+        base_url, token = entry
+        timeout = timeout or self.timeout
+
+        # TCP 预检：宕机或被丢包的主机在短超时内即可判定，不必等满整个 HTTP 超时
+        # 配置了代理时直连可能被防火墙拦截，交给 HTTP 请求判断
+        try:
+            parts = urlsplit(base_url)
+        except ValueError:  # URL 格式错误
+            return False
+        if parts.scheme not in _proxy_schemes():
+            try:
+                port = parts.port or (443 if parts.scheme == "https" else 80)
+                if not parts.hostname:
+                    return False
+                _open_connection(parts.hostname, port, min(self.PREFLIGHT_TIMEOUT, timeout)).close()
+            except (OSError, ValueError):  # ValueError: URL 中的端口无效
+                return False
+
+        try:
+            self._make_test_request(base_url, token, timeout)
+        except (OSError, ValueError):
+            # 与 _probe_api 一致：requests 的异常均继承自 OSError；
+            # token 含非 latin-1 字符时请求头编码失败会抛出 UnicodeEncodeError（ValueError 子类）
+            return False
+
+        self._warmed_hosts.add(parts.netloc)
+        return True
+
+    def test_apis_concurrent(self, models: Optional[Sequence[str]] = None, show_progress: bool = True,
+                             on_result=None) -> Dict[str, Tuple[bool, Optional[float]]]:
+        """并发测试多个API
+
+        分两个阶段：先并发热身、预先建立连接，再并发发送计时请求。
+        计时请求全部复用已建立的连接；热身全部失败的主机直接判定为不可用，
+        不再发送计时请求。
+
+        Args:
+            models: 要测试的模型列表，默认全部
+            show_progress: 是否显示进度条
+            on_result: 每得到一个结果就在主线程中调用 on_result(模型名, 是否可用, 响应时间)
+        """
+        # 并发相关模块只在测速时导入，不联网的命令无需承担其导入开销
+        from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
+
         if models is None:
-            models = list(self.config.keys())
+            models = self._model_names
 
         results = {}
         completed = 0
         total = len(models)
 
-        if show_progress:
-            print_progress_bar(0, total, prefix="🔍 测试进度")
-
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            # 提交所有任务
-            future_to_model = {
-                executor.submit(self.test_api, model): model
+        def draw_progress():
+            # 逐行输出结果时不绘制完成帧：完成帧会换行，残留在表格下方；由调用方清除进度条
+            if show_progress and not (on_result and completed == total):
+                print_progress_bar(completed, total, prefix="🔍 测试进度")
+
+        def record(model: str, status: bool, resp_time: Optional[float]):
+            nonlocal completed
+            results[model] = (status, resp_time)
+            self._probe_cache[model] = (time.monotonic(), (status, resp_time))
+            completed += 1
+            if on_result:
+                on_result(model, status, resp_time)
+            draw_progress()
+
+        # 每个阶段的总等待上限，避免个别挂起的端点拖住整个列表
+        deadline = self.timeout + 1.0
+
+        # 没有模型时初始帧即完成帧，留给下面的提前返回绘制，避免重复输出
+        if total:
+            draw_progress()
+
+        # 缺少 URL 或 TOKEN 的模型直接记为失败；有效期内已有结果的模型不再重复测试
+        to_probe = []
+        for model in models:
+            entry = self._entries.get(model)
+            known = (False, None) if not entry or not all(entry) else self._cached_probe(model)
+            if known:
+                results[model] = known
+                completed += 1
+                if on_result:
+                    on_result(model, *known)
+            else:
+                to_probe.append(model)
+        models = to_probe
+        if not models:
+            draw_progress()
+            return results
+
+        executor = self._executor
+        if not self.fast_probe:
+            self._session  # 在主线程中创建会话，避免多个工作线程同时初始化
+        pending = []
+        try:
+            # 阶段一：每个模型预先建立一个连接（HTTP/1.1 连接不能被并发请求共用）
+            # 快速探测不复用连接，无需热身；之前已热身过的主机也跳过
+            warmups = {} if self.fast_probe else {
+                executor.submit(self._warmup, model): model
                 for model in models
+                if self._model_host(model) not in self._warmed_hosts
             }
+            pending.extend(warmups)
+            reachable_hosts = set(self._warmed_hosts)
+            try:
+                for future in as_completed(warmups, timeout=deadline):
+                    try:
+                        reachable = future.result()
+                    except Exception:
+                        # 与阶段二一致：异常只影响该模型，不中断整个列表
+                        reachable = False
+                    if reachable:
+                        reachable_hosts.add(self._model_host(warmups[future]))
+            except FuturesTimeoutError:
+                pass  # 超时未完成的热身视为不可达
+
+            # 阶段二：对可达主机上的模型计时，不可达的直接记为失败
+            future_to_model = {}
+            for model in models:
+                host = self._model_host(model)
+                if host and (self.fast_probe or host in reachable_hosts):
+                    future = executor.submit(self.test_api, model, use_warmup=False)
+                    future_to_model[future] = model
+                    pending.append(future)
+                else:
+                    record(model, False, None)
 
             # 收集结果
-            for future in as_completed(future_to_model):
-                model = future_to_model[future]
-                try:
-                    status, resp_time = future.result()
-                    results[model] = (status, resp_time)
-                except Exception as e:
-                    results[model] = (False, None)
-
-                completed += 1
-                if show_progress:
-                    print_progress_bar(completed, total, prefix="🔍 测试进度")
+            try:
+                for future in as_completed(future_to_model, timeout=deadline):
+                    try:
+                        status, resp_time = future.result()
+                    except Exception:
+                        # test_api 已处理网络错误；其余异常只影响该模型，不中断整个列表
+                        status, resp_time = False, None
+                    record(future_to_model[future], status, resp_time)
+            except FuturesTimeoutError:
+                # 超时未返回的模型记为不可用
+                for model in future_to_model.values():
+                    if model not in results:
+                        record(model, False, None)
+        finally:
+            # 线程池是共享的，只取消尚未开始的任务；已在运行的请求会在各自的超时后结束
+            for future in pending:
+                future.cancel()
 
         return results
 
 
-def parse_timeout_arg() -> Optional[int]:
-    """从命令行参数中解析超时时间"""
-    for i, arg in enumerate(sys.argv):
-        if arg in ["--timeout", "-t"]:
-            if i + 1 < len(sys.argv):
+def parse_global_args(argv: List[str]) -> Tuple[dict, List[str]]:
+    """一次扫描解析全局参数，返回 (EnvManager 参数, 去掉全局参数后的命令行)"""
+    options = {"timeout": None, "fast_probe": False, "deep_probe": False, "use_cache": True}
+    rest = []
+    args = iter(argv)
+    for arg in args:
+        if arg in ("--timeout", "-t"):
+            value = next(args, None)
+            if value is not None:
                 try:
-                    return int(sys.argv[i + 1])
+                    options["timeout"] = int(value)
                 except ValueError:
-                    print(f"⚠️  无效的超时时间: {sys.argv[i + 1]}")
-    return None
-
+                    print(f"⚠️  无效的超时时间: {value}")
+        elif arg == "--fast":
+            options["fast_probe"] = True
+        elif arg == "--deep":
+            options["deep_probe"] = True
+        elif arg == "--no-cache":
+            options["use_cache"] = False
+        else:
+            rest.append(arg)
+    return options, rest
+
+
+# 帮助信息（一次写出）
+_HELP = """\
+🎯 Claude 模型切换工具
+
+常用命令:
+  python set_model.py                    # 交互模式（推荐）
+  python set_model.py <模型名>           # 快速切换模型
+  python set_model.py status             # 查看当前模型状态（含地址和Token）
+  python set_model.py list               # 查看所有模型状态
+
+管理命令:
+  python set_model.py add <名称> <URL> [TOKEN]     # 添加模型
+  python set_model.py update <名称> --url <URL>    # 更新URL
+  python set_model.py update <名称> --token <TOKEN> # 更新TOKEN
+  python set_model.py remove <模型名>              # 删除模型
+  python set_model.py show               # 显示配置信息（脱敏）
+
+设置命令:
+  python set_model.py setup-alias        # 自动配置 claude-switch 别名
+  python set_model.py config-path        # 查看配置文件路径
+  python set_model.py interactive        # 显式交互模式
+
+全局参数:
+  --timeout, -t <秒>                     # 设置API测试超时时间（默认5秒）
+  --fast                                 # 快速探测：只测 TCP/TLS 握手，不发送 HTTP 请求
+  --deep                                 # 深度探测：发送真实请求验证模型可用（消耗少量额度）
+  --no-cache                             # 不使用 5 秒内的测试结果，总是重新测试
+
+命令别名:
+  list: ls, -l        status: st, -s
+  add: -a             update: up, -u      remove: rm, -r
+  interactive: i, -i  show: info
+  setup-alias: setup
+
+💡 提示:
+  - 首次使用建议运行 'python set_model.py setup-alias' 配置别名
+  - 配置别名后可直接使用 'claude-switch' 命令，环境变量立即生效
+  - 无参数启动进入交互模式，显示所有API状态和响应速度
+  - status命令显示当前模型的详细信息（地址和Token）
+  - list命令显示所有模型的状态列表
+  - 使用热身请求技术提高测速准确性（自动启用）
+  - 使用 --timeout 参数可以自定义超时时间，如: python set_model.py status -t 10
+"""
+
+
+# 命令别名 -> 处理函数，由 @command 在导入时注册；未匹配的命令视为模型名
+COMMANDS: Dict[str, Callable[[EnvManager, List[str]], None]] = {}
+
+
+def command(*aliases: str):
+    """注册命令处理函数及其所有别名"""
+    def decorator(handler):
+        COMMANDS.update(dict.fromkeys(aliases, handler))
+        return handler
+    return decorator
+
+
+@command("status", "st", "--status", "-s")
+def _cmd_status(manager: EnvManager, argv: List[str]):
+    """显示当前模型状态（包含地址和 API key）"""
+    current = manager.get_current_model()
+    if current:
+        print(f"📍 当前模型: {current}")
+        print("=" * 60)
 
-def main():
-    # 解析全局超时参数
-    timeout = parse_timeout_arg()
-    manager = EnvManager(timeout=timeout)
+        # 显示配置信息
+        entry = manager.get_entry(current)
+        if entry:
+            print(f"API 地址: {entry.base_url or 'N/A'}")
+            print(f"API Token: {mask_sensitive_info(entry.token, 10)}")
+
+        # 一次并发测试所有模型：当前模型不可用时可直接给出其他模型的状态
+        print()
+        results = manager.test_apis_concurrent(show_progress=True)
+        print()
+        status, resp_time = results.get(current, (False, None))
+        if status:
+            print(f"连接状态: ✅ 可用 (响应时间: {resp_time:.2f}s)")
+        else:
+            print(f"连接状态: ❌ 不可用")
+            print(f"\n💡 其他模型状态:")
+            manager.list_models(show_status=True, results=results)
+    else:
+        print("⚠️  当前未设置模型\n")
+        print("可用模型:")
+        manager.list_models(show_status=True)
 
-    # 没有参数时启动交互模式
-    if len(sys.argv) < 2:
-        manager.interactive_mode()
-        sys.exit(0)
 
-    command = sys.argv[1]
-
-    # 显示当前模型状态（包含地址和 API key）
-    if command in ["status", "st", "--status", "-s"]:
-        current = manager.get_current_model()
-        if current:
-            print(f"📍 当前模型: {current}")
-            print("=" * 60)
-
-            # 显示配置信息
-            if current in manager.config:
-                config = manager.config[current]
-                print(f"API 地址: {config.get('ANTHROPIC_BASE_URL', 'N/A')}")
-                token = config.get('ANTHROPIC_AUTH_TOKEN', '')
-                print(f"API Token: {mask_sensitive_info(token, 10)}")
-
-            # 测试当前模型状态
-            print()
-            status, resp_time = manager.test_api(current)
-            if status:
-                print(f"连接状态: ✅ 可用 (响应时间: {resp_time:.2f}s)")
-            else:
-                print(f"连接状态: ❌ 不可用")
-                print(f"\n💡 正在检测其他可用模型...")
-                manager.list_models(show_status=True)
+@command("list", "ls", "--list", "-l")
+def _cmd_list(manager: EnvManager, argv: List[str]):
+    """列出所有模型（带状态检测）"""
+    manager.list_models(show_status=True)
+
+
+@command("interactive", "i", "--interactive", "-i")
+def _cmd_interactive(manager: EnvManager, argv: List[str]):
+    """交互模式"""
+    manager.interactive_mode()
+
+
+@command("add", "--add", "-a")
+def _cmd_add(manager: EnvManager, argv: List[str]):
+    """添加模型"""
+    if len(argv) < 4:
+        print("💡 用法: python set_model.py add <模型名> <BASE_URL> [TOKEN]")
+        sys.exit(1)
+    name = argv[2]
+    base_url = argv[3]
+    token = argv[4] if len(argv) > 4 else input("请输入 TOKEN: ").strip()
+    manager.add_model(name, base_url, token)
+
+
+@command("update", "up", "--update", "-u")
+def _cmd_update(manager: EnvManager, argv: List[str]):
+    """更新模型"""
+    if len(argv) < 3:
+        print("💡 用法: python set_model.py update <模型名> [--url <URL>] [--token <TOKEN>]")
+        print("示例: python set_model.py update 哈吉米 --url https://new-url.com")
+        sys.exit(1)
+
+    name = argv[2]
+    base_url = None
+    token = None
+
+    # 解析参数
+    i = 3
+    while i < len(argv):
+        if argv[i] in ("--url", "-url"):
+            base_url = argv[i + 1] if i + 1 < len(argv) else None
+            i += 2
+        elif argv[i] in ("--token", "-token"):
+            token = argv[i + 1] if i + 1 < len(argv) else None
+            i += 2
         else:
-            print("⚠️  当前未设置模型\n")
-            print("可用模型:")
-            manager.list_models(show_status=True)
-        sys.exit(0)
+            i += 1
 
-    # 列出所有模型（带状态检测）
-    if command in ["list", "ls", "--list", "-l"]:
-        manager.list_models(show_status=True)
-        sys.exit(0)
+    manager.update_model(name, base_url, token)
 
-    # 交互模式
-    if command in ["interactive", "i", "--interactive", "-i"]:
-        manager.interactive_mode()
-        sys.exit(0)
 
-    # 添加模型
-    if command in ["add", "--add", "-a"]:
-        if len(sys.argv) < 4:
-            print("💡 用法: python set_model.py add <模型名> <BASE_URL> [TOKEN]")
-            sys.exit(1)
-        name = sys.argv[2]
-        base_url = sys.argv[3]
-        token = sys.argv[4] if len(sys.argv) > 4 else input("请输入 TOKEN: ").strip()
-        manager.add_model(name, base_url, token)
-        sys.exit(0)
+@command("remove", "rm", "--remove", "-r")
+def _cmd_remove(manager: EnvManager, argv: List[str]):
+    """删除模型"""
+    if len(argv) < 3:
+        print("💡 用法: python set_model.py remove <模型名>")
+        sys.exit(1)
+    manager.remove_model(argv[2])
 
-    # 更新模型
-    if command in ["update", "up", "--update", "-u"]:
-        if len(sys.argv) < 3:
-            print("💡 用法: python set_model.py update <模型名> [--url <URL>] [--token <TOKEN>]")
-            print("示例: python set_model.py update 哈吉米 --url https://new-url.com")
-            sys.exit(1)
 
-        name = sys.argv[2]
-        base_url = None
-        token = None
-
-        # 解析参数
-        i = 3
-        while i < len(sys.argv):
-            if sys.argv[i] in ["--url", "-url"]:
-                base_url = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
-                i += 2
-            elif sys.argv[i] in ["--token", "-token"]:
-                token = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
-                i += 2
-            else:
-                i += 1
+@command("show", "info", "--show")
+def _cmd_show(manager: EnvManager, argv: List[str]):
+    """显示配置信息（脱敏）"""
+    lines = ["📋 配置信息 (Token 已脱敏)\n"]
+    current = manager.get_current_model()
+    for model_name in manager.config:
+        entry = manager.get_entry(model_name)
+        marker = " ⭐" if model_name == current else ""
+        lines.append(f"{model_name}{marker}")
+        lines.append(f"  URL:   {entry.base_url or 'N/A'}")
+        lines.append(f"  TOKEN: {mask_sensitive_info(entry.token, 10)}\n")
+    print("\n".join(lines))
 
-        manager.update_model(name, base_url, token)
-        sys.exit(0)
 
-    # 删除模型
-    if command in ["remove", "rm", "--remove", "-r"]:
-        if len(sys.argv) < 3:
-            print("💡 用法: python set_model.py remove <模型名>")
-            sys.exit(1)
-        manager.remove_model(sys.argv[2])
-        sys.exit(0)
+@command("setup-alias", "setup", "--setup-alias")
+def _cmd_setup_alias(manager: EnvManager, argv: List[str]):
+    """配置别名"""
+    manager.setup_alias()
 
-    # 显示配置信息（脱敏）
-    if command in ["show", "info", "--show"]:
-        print("📋 配置信息 (Token 已脱敏)\n")
-        for model_name, config in manager.config.items():
-            marker = " ⭐" if model_name == manager.get_current_model() else ""
-            print(f"{model_name}{marker}")
-            print(f"  URL:   {config.get('ANTHROPIC_BASE_URL', 'N/A')}")
-            token = config.get('ANTHROPIC_AUTH_TOKEN', '')
-            print(f"  TOKEN: {mask_sensitive_info(token, 10)}")
-            print()
-        sys.exit(0)
 
-    # 配置别名
-    if command in ["setup-alias", "setup", "--setup-alias"]:
-        manager.setup_alias()
-        sys.exit(0)
+@command("config-path", "path", "--config-path")
+def _cmd_config_path(manager: EnvManager, argv: List[str]):
+    """查看配置文件路径"""
+    print(f"📁 配置文件路径:")
+    print(f"   {manager.config_path}")
+    print(f"\n📂 配置目录:")
+    print(f"   {manager.config_dir}")
+
+
+@command("help", "--help", "-h")
+def _cmd_help(manager: EnvManager, argv: List[str]):
+    """帮助信息"""
+    sys.stdout.write(_HELP)
 
-    # 查看配置文件路径
-    if command in ["config-path", "path", "--config-path"]:
-        print(f"📁 配置文件路径:")
-        print(f"   {manager.config_path}")
-        print(f"\n📂 配置目录:")
-        print(f"   {manager.config_dir}")
-        sys.exit(0)
 
-    # 帮助信息
-    if command in ["help", "--help", "-h"]:
-        print("🎯 Claude 模型切换工具")
-        print("\n常用命令:")
-        print("  python set_model.py                    # 交互模式（推荐）")
-        print("  python set_model.py <模型名>           # 快速切换模型")
-        print("  python set_model.py status             # 查看当前模型状态（含地址和Token）")
-        print("  python set_model.py list               # 查看所有模型状态")
-        print("\n管理命令:")
-        print("  python set_model.py add <名称> <URL> [TOKEN]     # 添加模型")
-        print("  python set_model.py update <名称> --url <URL>    # 更新URL")
-        print("  python set_model.py update <名称> --token <TOKEN> # 更新TOKEN")
-        print("  python set_model.py remove <模型名>              # 删除模型")
-        print("  python set_model.py show               # 显示配置信息（脱敏）")
-        print("\n设置命令:")
-        print("  python set_model.py setup-alias        # 自动配置 claude-switch 别名")
-        print("  python set_model.py config-path        # 查看配置文件路径")
-        print("  python set_model.py interactive        # 显式交互模式")
-        print("\n全局参数:")
-        print("  --timeout, -t <秒>                     # 设置API测试超时时间（默认5秒）")
-        print("\n命令别名:")
-        print("  list: ls, -l        status: st, -s")
-        print("  add: -a             update: up, -u      remove: rm, -r")
-        print("  interactive: i, -i  show: info")
-        print("  setup-alias: setup")
-        print("\n💡 提示:")
-        print("  - 首次使用建议运行 'python set_model.py setup-alias' 配置别名")
-        print("  - 配置别名后可直接使用 'claude-switch' 命令，环境变量立即生效")
-        print("  - 无参数启动进入交互模式，显示所有API状态和响应速度")
-        print("  - status命令显示当前模型的详细信息（地址和Token）")
-        print("  - list命令显示所有模型的状态列表")
-        print("  - 使用热身请求技术提高测速准确性（自动启用）")
-        print("  - 使用 --timeout 参数可以自定义超时时间，如: python set_model.py status -t 10")
+def main():
+    # 解析全局参数（--timeout/--fast/--deep/--no-cache 可出现在任意位置）
+    options, argv = parse_global_args(sys.argv)
+    manager = EnvManager(**options)
+
+    # 没有参数时启动交互模式
+    if len(argv) < 2:
+        manager.interactive_mode()
         sys.exit(0)
 
-    # 默认：切换模型
-    manager.switch_model(command)
+    command_name = argv[1]
+    handler = COMMANDS.get(command_name)
+    if handler is None:
+        # 默认：切换模型
+        manager.switch_model(command_name)
+        return
+
+    handler(manager, argv)
+    sys.exit(0)
 
 
 if __name__ == "__main__":
@@ -17,18 +17,31 @@ if [ ! -f "$PYTHON_SCRIPT" ]; then
     return 1 2>/dev/null || exit 1
 fi
 
-# 检测 shell 配置文件
-if [ -f ~/.zshrc ]; then
-    SHELL_CONFIG=~/.zshrc
-elif [ -f ~/.bashrc ]; then
-    SHELL_CONFIG=~/.bashrc
-elif [ -f ~/.bash_profile ]; then
-    SHELL_CONFIG=~/.bash_profile
-elif [ -f ~/.profile ]; then
-    SHELL_CONFIG=~/.profile
-else
-    SHELL_CONFIG=""
-fi
+# 检测 shell 配置文件（与 set_model.py 一致：优先根据 $SHELL 判断）
+case "${SHELL##*/}" in
+    zsh)
+        SHELL_CONFIG=~/.zshrc
+        ;;
+    bash)
+        case "$OSTYPE" in
+            darwin*) SHELL_CONFIG=~/.bash_profile ;;
+            *) SHELL_CONFIG=~/.bashrc ;;
+        esac
+        ;;
+    *)
+        if [ -f ~/.zshrc ]; then
+            SHELL_CONFIG=~/.zshrc
+        elif [ -f ~/.bashrc ]; then
+            SHELL_CONFIG=~/.bashrc
+        elif [ -f ~/.bash_profile ]; then
+            SHELL_CONFIG=~/.bash_profile
+        elif [ -f ~/.profile ]; then
+            SHELL_CONFIG=~/.profile
+        else
+            SHELL_CONFIG=""
+        fi
+        ;;
+esac
 
 # 保存切换前的环境变量
 OLD_BASE_URL="$ANTHROPIC_BASE_URL"
@@ -39,9 +52,9 @@ python3 "$PYTHON_SCRIPT" "$@"
 EXIT_CODE=$?
 
 # 如果 Python 脚本成功执行，重新加载环境变量
-if [ $EXIT_CODE -eq 0 ] && [ -n "$SHELL_CONFIG" ]; then
-    # 提取并导出 ANTHROPIC 环境变量（使用最新的两行）
-    eval "$(grep -E '^export (ANTHROPIC_BASE_URL|ANTHROPIC_AUTH_TOKEN)=' "$SHELL_CONFIG" | tail -2)"
+if [ $EXIT_CODE -eq 0 ] && [ -f "$SHELL_CONFIG" ]; then
+    # 提取并导出 ANTHROPIC 环境变量（使用最新的两行，允许行首缩进，如 if 块内的 export）
+    eval "$(grep -E '^[[:space:]]*export[[:space:]]+(ANTHROPIC_BASE_URL|ANTHROPIC_AUTH_TOKEN)=' "$SHELL_CONFIG" | tail -2)"
 
     # 检查环境变量是否发生了变化
     if [ "$OLD_BASE_URL" != "$ANTHROPIC_BASE_URL" ] || [ "$OLD_TOKEN" != "$ANTHROPIC_AUTH_TOKEN" ]; then